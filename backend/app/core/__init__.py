@@ -3,7 +3,7 @@ Core application modules - configuration, database, authentication
 """
 from .config import Settings, get_settings
 from .database import get_db, engine, async_session_maker, Base, init_db
-from .auth import get_current_user, get_current_user_id, get_optional_user, ensure_usage_reset
+from .auth import get_current_user, get_current_user_id, require_user_id, get_optional_user, ensure_usage_reset
 
 __all__ = [
     "Settings",
@@ -15,6 +15,7 @@ __all__ = [
     "Base",
     "get_current_user",
     "get_current_user_id",
+    "require_user_id",
     "get_optional_user",
     "ensure_usage_reset",
 ]
@@ -28,6 +28,22 @@ async def get_current_user_id(request: Request) -> Optional[str]:
     return None
 
 
+async def require_user_id(request: Request) -> str:
+    """
+    Dependency to get current user ID from session.
+    Raises 401 if not authenticated.
+    """
+    user_id = await get_current_user_id(request)
+    
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized",
+        )
+    
+    return user_id
+
+
 async def get_current_user(
     request: Request,
     db: AsyncSession = Depends(get_db),
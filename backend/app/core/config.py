@@ -33,6 +33,7 @@ class Settings(BaseSettings):
     # Environment - read from NODE_ENV or default to development
     node_env: str = os.environ.get("NODE_ENV", "development")
     port: int = int(os.environ.get("PORT", "5000"))  # Default to 5000 for Replit deployment
+    workers: int = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))  # uvicorn worker processes
     
     # SMTP Email Settings
     smtp_server: str = "smtp.gmail.com"
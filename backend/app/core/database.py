@@ -90,12 +90,22 @@ else:
     sanitized_url = database_url.split('@')[-1] if '@' in database_url else database_url
     print(f"[Database] Connecting to: {sanitized_url}")
 
+    # Connection budget is shared by all uvicorn workers, so each worker gets a fixed slice.
+    # Keep DB_POOL_BUDGET below the server's max_connections (often ~100 on managed Postgres).
+    pool_budget = int(os.environ.get("DB_POOL_BUDGET", "60"))
+    if settings.workers > pool_budget:
+        raise RuntimeError(
+            f"WEB_CONCURRENCY={settings.workers} exceeds DB_POOL_BUDGET={pool_budget}; "
+            "each worker needs at least one database connection"
+        )
+    
     engine = create_async_engine(
         database_url,
         echo=_enable_echo,
-        pool_size=5,
-        max_overflow=10,
+        pool_size=pool_budget // settings.workers,  # Opened on demand and kept for reuse
+        max_overflow=0,  # Overflow connections are closed on check-in, so keep the whole share pooled
         pool_pre_ping=True,
+        pool_recycle=1800,  # Recycle before idle connections are dropped server-side
         connect_args=connect_args,
     )
 
@@ -4,8 +4,12 @@ Extract Routes - Template and General Extraction
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
 import httpx
 import io
+import threading
 
 from pypdf import PdfReader
 
@@ -50,14 +54,37 @@ ALLOWED_MIMES = [
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
 
+# Page counts keyed by content hash, so retried uploads skip the PDF parse
+_PAGE_COUNT_CACHE_SIZE = 256
+_page_count_cache: "OrderedDict[bytes, int]" = OrderedDict()
+_page_count_lock = threading.Lock()
+
 
 def get_pdf_page_count(buffer: bytes) -> int:
     """Get page count from PDF buffer. Returns 1 for non-PDF files."""
+    key = hashlib.blake2b(buffer, digest_size=16).digest()
+    with _page_count_lock:
+        cached = _page_count_cache.get(key)
+        if cached is not None:
+            _page_count_cache.move_to_end(key)
+            return cached
+
     try:
         reader = PdfReader(io.BytesIO(buffer))
-        return len(reader.pages)
+        page_count = len(reader.pages)
     except Exception:
-        return 1  # Default to 1 page for non-PDF or errors
+        page_count = 1  # Default to 1 page for non-PDF or errors
+
+    with _page_count_lock:
+        _page_count_cache[key] = page_count
+        if len(_page_count_cache) > _PAGE_COUNT_CACHE_SIZE:
+            _page_count_cache.popitem(last=False)
+    return page_count
+
+
+async def get_pdf_page_count_async(buffer: bytes) -> int:
+    """Get PDF page count in a worker thread so parsing doesn't block the event loop"""
+    return await asyncio.to_thread(get_pdf_page_count, buffer)
 
 
 async def upload_document_and_create_record(
@@ -280,7 +307,7 @@ async def general_extraction(
         raise HTTPException(status_code=400, detail="File too large (max 50MB)")
     
     # Get page count before calling LlamaParse API
-    page_count = get_pdf_page_count(buffer) if file.content_type == "application/pdf" else 1
+    page_count = await get_pdf_page_count_async(buffer) if file.content_type == "application/pdf" else 1
     
     # Check monthly limit with actual page count
     new_usage = user.monthly_usage + page_count
@@ -435,7 +462,7 @@ async def batch_template_extraction(
             await file.seek(0)
             
             # Get page count for PDFs
-            page_count = get_pdf_page_count(content)
+            page_count = await get_pdf_page_count_async(content)
             
             # Check usage limit
             pages_remaining = current_user.monthly_limit - current_user.monthly_usage
@@ -604,7 +631,7 @@ async def batch_general_extraction(
             await file.seek(0)
             
             # Get page count for PDFs
-            page_count = get_pdf_page_count(content)
+            page_count = await get_pdf_page_count_async(content)
             
             # Check usage limit
             pages_remaining = current_user.monthly_limit - current_user.monthly_usage
@@ -9,7 +9,8 @@ try:
         ObjectStorageService, 
         ObjectPermission, 
         ObjectAclPolicy, 
-        ObjectNotFoundError
+        ObjectNotFoundError,
+        get_object_storage_service,
     )
 except ImportError:
     # Dummy classes for when GCS is not available
@@ -17,6 +18,7 @@ except ImportError:
     ObjectPermission = None
     ObjectAclPolicy = None
     ObjectNotFoundError = Exception
+    get_object_storage_service = None
 
 from .llama_parse import (
     LlamaParseService, 
@@ -46,6 +48,7 @@ __all__ = [
     "ObjectPermission",
     "ObjectAclPolicy",
     "ObjectNotFoundError",
+    "get_object_storage_service",
     # LlamaParse
     "LlamaParseService",
     "LlamaParseError",
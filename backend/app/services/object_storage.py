@@ -15,6 +15,8 @@ from enum import Enum
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 
+from starlette.concurrency import run_in_threadpool
+
 from app.core.config import get_settings
 
 # Try importing GCS, but fallback to local storage if not available
@@ -179,7 +181,8 @@ class ObjectStorageService:
             bucket = self.client.bucket(bucket_name)
             blob = bucket.blob(object_name)
             
-            if blob.exists():
+            # GCS client calls are blocking - keep them off the event loop
+            if await run_in_threadpool(blob.exists):
                 return blob
         
         return None
@@ -220,7 +223,7 @@ class ObjectStorageService:
         bucket = self.client.bucket(bucket_name)
         blob = bucket.blob(object_name)
         
-        if not blob.exists():
+        if not await run_in_threadpool(blob.exists):
             raise ObjectNotFoundError()
         
         return blob
@@ -278,7 +281,7 @@ class ObjectStorageService:
         blob: object,
     ) -> Optional[ObjectAclPolicy]:
         """Get ACL policy from object metadata"""
-        blob.reload()
+        await run_in_threadpool(blob.reload)
         metadata = blob.metadata or {}
         acl_data = metadata.get(ACL_POLICY_METADATA_KEY)
         
@@ -317,11 +320,25 @@ class ObjectStorageService:
         """Download object content as bytes"""
         return blob.download_as_bytes()
     
-    def get_object_metadata(self, blob: object) -> dict:
-        """Get object metadata"""
-        blob.reload()
+    def get_object_metadata(self, blob: object, reload: bool = True) -> dict:
+        """Get object metadata (pass reload=False if the blob was just reloaded)"""
+        if reload:
+            blob.reload()
         return {
             "content_type": blob.content_type,
             "size": blob.size,
             "updated": blob.updated,
+            "etag": blob.etag,
         }
+
+
+# Singleton instance
+_object_storage_service: Optional[ObjectStorageService] = None
+
+
+def get_object_storage_service() -> ObjectStorageService:
+    """Get or create the shared object storage service (reuses one storage client)"""
+    global _object_storage_service
+    if _object_storage_service is None:
+        _object_storage_service = ObjectStorageService()
+    return _object_storage_service
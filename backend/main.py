@@ -4,14 +4,26 @@ Document AI Extractor Backend
 """
 import os
 import sys
+import time
+import queue
+import hashlib
+import logging
+import logging.handlers
+from functools import partial
 from pathlib import Path
+from typing import Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import anyio.to_thread
+import orjson
 import uvicorn
 
 # Add parent directory to path for imports
@@ -19,6 +31,12 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from app.core.config import get_settings
 from app.core.database import init_db
+from app.core.auth import require_user_id
+from app.services.object_storage import (
+    ObjectPermission,
+    ObjectNotFoundError,
+    get_object_storage_service,
+)
 from app.routes import (
     auth_router,
     documents_router,
@@ -30,14 +48,47 @@ from app.routes import (
 )
 
 
+class AccessLogFormatter(logging.Formatter):
+    """Formatter that reuses the formatted timestamp for records within the same second"""
+
+    def __init__(self, fmt: str, datefmt: str):
+        super().__init__(fmt, datefmt)
+        self._last_second = -1
+        self._last_stamp = ""
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        second = int(record.created)
+        if second != self._last_second:
+            self._last_stamp = super().formatTime(record, datefmt)
+            self._last_second = second
+        return self._last_stamp
+
+
+# Access logger - records are queued and written to stdout by a background thread
+# (the listener is started and stopped by the app lifespan)
+access_logger = logging.getLogger("fastapi.access")
+access_logger.setLevel(logging.INFO)
+access_logger.propagate = False
+
+_access_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_access_log_handler = logging.StreamHandler(sys.stdout)
+_access_log_handler.setFormatter(AccessLogFormatter("%(asctime)s [fastapi] %(message)s", "%I:%M:%S %p"))
+access_logger.addHandler(logging.handlers.QueueHandler(_access_log_queue))
+access_log_listener = logging.handlers.QueueListener(_access_log_queue, _access_log_handler)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events - keep fast for health checks!"""
     # Startup - minimal work here to pass health check quickly
     settings = get_settings()
+    access_log_listener.start()
     print(f"[FastAPI] Starting server in {settings.node_env} mode")
     print(f"[FastAPI] API key configured: {settings.llama_cloud_api_key[:10]}..." if settings.llama_cloud_api_key else "[FastAPI] WARNING: No API key configured")
     
+    # Blocking storage reads run in the threadpool - allow more than anyio's default 40
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 100
+    
     # Don't initialize database here - do it lazily on first request
     # This ensures health check passes immediately
     print("[FastAPI] Server ready (database will init on first request)")
@@ -46,6 +97,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("[FastAPI] Shutting down...")
+    access_log_listener.stop()
 
 
 # Create FastAPI app
@@ -54,14 +106,31 @@ app = FastAPI(
     description="API for extracting structured data from documents using LlamaCloud",
     version="2.5.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Get settings
 settings = get_settings()
 
-# Add session middleware
+class ConditionalSessionMiddleware:
+    """SessionMiddleware that is bypassed for paths which never touch the session"""
+
+    def __init__(self, app: ASGIApp, skip_prefixes: tuple, **session_options):
+        self.app = app
+        self.session_app = SessionMiddleware(app, **session_options)
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+        else:
+            await self.session_app(scope, receive, send)
+
+
+# Add session middleware (skipped for static assets and the health check)
 app.add_middleware(
-    SessionMiddleware,
+    ConditionalSessionMiddleware,
+    skip_prefixes=("/assets/", "/favicon.png", "/opengraph.jpg", "/api/health"),
     secret_key=settings.session_secret,
     session_cookie="session",
     max_age=7 * 24 * 60 * 60,  # 1 week
@@ -82,24 +151,100 @@ app.add_middleware(
 )
 
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
+# Request logging middleware (pure ASGI - avoids BaseHTTPMiddleware per-request overhead)
+class AccessLogMiddleware:
     """Log API requests"""
-    import time
-    from datetime import datetime
-    
-    start_time = time.time()
-    
-    response = await call_next(request)
-    
-    duration = time.time() - start_time
-    
-    if request.url.path.startswith("/api"):
-        timestamp = datetime.now().strftime("%I:%M:%S %p")
-        print(f"{timestamp} [fastapi] {request.method} {request.url.path} {response.status_code} in {int(duration * 1000)}ms")
-    
-    return response
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith("/api")
+            or not access_logger.isEnabledFor(logging.INFO)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            access_logger.info(
+                "%s %s %s in %dms", scope["method"], scope["path"], status_code, int(duration * 1000)
+            )
+
+
+app.add_middleware(AccessLogMiddleware)
+
+class SelectiveGZipMiddleware:
+    """GZipMiddleware limited to compressible bodies - API JSON and text SPA files"""
+
+    def __init__(self, app: ASGIApp, skip_prefixes: tuple, skip_suffixes: tuple, **gzip_options):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, **gzip_options)
+        self.skip_prefixes = skip_prefixes
+        self.skip_suffixes = skip_suffixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and (
+            scope["path"].startswith(self.skip_prefixes)
+            or scope["path"].lower().endswith(self.skip_suffixes)
+        ):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip_app(scope, receive, send)
+
+
+# Compress JSON and SPA text assets (wraps every layer except the health fast path).
+# Stored objects and already-compressed media are sent as-is - gzipping them gains
+# nothing and large downloads would be compressed on the event loop.
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    skip_prefixes=("/objects/", "/public-objects/"),
+    skip_suffixes=(
+        ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+        ".pdf", ".zip", ".gz", ".woff", ".woff2", ".mp4", ".webm",
+    ),
+    minimum_size=1024,
+    compresslevel=5,
+)
+
+
+HEALTH_PATH = "/api/health"
+HEALTH_BODY = orjson.dumps({"status": "ok", "service": "document-ai-extractor"})
+HEALTH_HEADERS = [
+    (b"content-type", b"application/json"),
+    (b"content-length", str(len(HEALTH_BODY)).encode()),
+]
+
+
+class HealthCheckMiddleware:
+    """Answer GET /api/health with prebuilt bytes, skipping routing and all other middleware"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"] == HEALTH_PATH and scope["method"] == "GET":
+            await send({"type": "http.response.start", "status": 200, "headers": HEALTH_HEADERS})
+            await send({"type": "http.response.body", "body": HEALTH_BODY})
+            return
+        await self.app(scope, receive, send)
+
+
+# Registered last so deployment health probes never reach the heavier layers
+app.add_middleware(HealthCheckMiddleware)
 
 
 # Include routers
@@ -112,20 +257,47 @@ app.include_router(user_router)
 app.include_router(search_router)
 
 
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client's If-None-Match already covers this ETag (weak comparison)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
+
+
+def weak_etag(content: bytes) -> str:
+    """Weak ETag for static content - weak because the gzip layer may re-encode the body"""
+    return 'W/"' + hashlib.blake2b(content, digest_size=12).hexdigest() + '"'
+
+
+async def object_response(request: Request, metadata: dict, content_loader, cache_control: str) -> Response:
+    """Build an object response, answering 304 when the storage ETag still matches"""
+    headers = {"Cache-Control": cache_control}
+    if metadata.get("etag"):
+        etag = '"' + metadata["etag"].strip('"') + '"'
+        headers["ETag"] = etag
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+    
+    return Response(
+        content=await run_in_threadpool(content_loader),
+        media_type=metadata.get("content_type") or "application/octet-stream",
+        headers=headers,
+    )
+
+
 # Object storage routes for serving files
 @app.get("/objects/{object_path:path}")
-async def serve_private_object(object_path: str, request: Request):
+async def serve_private_object(
+    object_path: str,
+    request: Request,
+    user_id: str = Depends(require_user_id),
+):
     """Serve private objects with ACL check"""
-    from app.core.auth import get_current_user_id
-    from app.services.object_storage import ObjectStorageService, ObjectPermission, ObjectNotFoundError
-    
-    user_id = await get_current_user_id(request)
-    
-    if not user_id:
-        return JSONResponse(status_code=401, content={"message": "Unauthorized"})
-    
     try:
-        object_storage = ObjectStorageService()
+        # Shared singleton, fetched inside the try so a missing GCS setup still returns JSON
+        object_storage = get_object_storage_service()
         blob = await object_storage.get_object_entity_file(f"/objects/{object_path}")
         
         can_access = await object_storage.can_access_object_entity(
@@ -135,131 +307,183 @@ async def serve_private_object(object_path: str, request: Request):
         )
         
         if not can_access:
-            return JSONResponse(status_code=401, content={"message": "Access denied"})
+            return ORJSONResponse(status_code=401, content={"message": "Access denied"})
         
-        # Get metadata and stream content
-        metadata = object_storage.get_object_metadata(blob)
-        content = object_storage.download_object(blob)
-        
-        return FileResponse(
-            str(content),
-            media_type=metadata.get("content_type", "application/octet-stream"),
-            headers={
-                "Cache-Control": "private, max-age=3600",
-            }
+        # The ACL check already reloaded the blob, so its metadata is current.
+        # Content is only downloaded when the client copy is stale.
+        metadata = object_storage.get_object_metadata(blob, reload=False)
+        return await object_response(
+            request,
+            metadata,
+            partial(object_storage.download_object, blob),
+            "private, max-age=3600",
         )
     except ObjectNotFoundError:
-        return JSONResponse(status_code=404, content={"message": "Object not found"})
+        return ORJSONResponse(status_code=404, content={"message": "Object not found"})
     except Exception as e:
         print(f"Error serving object: {e}")
-        return JSONResponse(status_code=500, content={"message": "Internal server error"})
+        return ORJSONResponse(status_code=500, content={"message": "Internal server error"})
 
 
 @app.get("/public-objects/{file_path:path}")
-async def serve_public_object(file_path: str):
+async def serve_public_object(
+    file_path: str,
+    request: Request,
+):
     """Serve public objects"""
-    from app.services.object_storage import ObjectStorageService
-    
     try:
-        object_storage = ObjectStorageService()
+        object_storage = get_object_storage_service()
         blob = await object_storage.search_public_object(file_path)
         
         if not blob:
-            return JSONResponse(status_code=404, content={"error": "File not found"})
+            return ORJSONResponse(status_code=404, content={"error": "File not found"})
         
-        metadata = object_storage.get_object_metadata(blob)
-        content = object_storage.download_object(blob)
-        
-        return FileResponse(
-            str(content),
-            media_type=metadata.get("content_type", "application/octet-stream"),
-            headers={
-                "Cache-Control": "public, max-age=3600",
-            }
+        metadata = await run_in_threadpool(object_storage.get_object_metadata, blob)
+        return await object_response(
+            request,
+            metadata,
+            partial(object_storage.download_object, blob),
+            "public, max-age=3600",
         )
     except Exception as e:
         print(f"Error serving public object: {e}")
-        return JSONResponse(status_code=500, content={"error": "Internal server error"})
+        return ORJSONResponse(status_code=500, content={"error": "Internal server error"})
 
 
-# Health check endpoint (must be before catch-all route)
-@app.get("/api/health")
+# Health check endpoint (must be before catch-all route). Requests are answered by
+# HealthCheckMiddleware; the route keeps the endpoint in the OpenAPI docs.
+@app.get(HEALTH_PATH)
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "service": "document-ai-extractor"}
 
 
+# Path prefixes the SPA catch-all must never answer with index.html
+SPA_RESERVED_PREFIXES = ("api/", "objects/", "public-objects/", "assets/")
+
+
 # Helper function to find static directory
-def get_static_path():
+STATIC_PATH_CANDIDATES = (
+    Path(__file__).parent.parent / "dist" / "public",  # /workspace/dist/public
+    Path(__file__).parent / "dist" / "public",  # /workspace/backend/dist/public
+    Path("/home/runner/workspace/dist/public"),  # Absolute path for Replit
+)
+
+
+def get_static_path() -> Optional[Path]:
     """Find the static files directory"""
-    possible_paths = [
-        Path(__file__).parent.parent / "dist" / "public",  # /workspace/dist/public
-        Path(__file__).parent / "dist" / "public",  # /workspace/backend/dist/public
-        Path("/home/runner/workspace/dist/public"),  # Absolute path for Replit
-    ]
-    
-    for path in possible_paths:
-        if path.exists() and (path / "index.html").exists():
+    for path in STATIC_PATH_CANDIDATES:
+        # A present index.html implies the directory exists - one stat per candidate
+        if (path / "index.html").is_file():
             print(f"[FastAPI] Found static files at: {path}")
             return path
     
-    print(f"[FastAPI] Static files not found. Tried: {possible_paths}")
+    print(f"[FastAPI] Static files not found. Tried: {list(STATIC_PATH_CANDIDATES)}")
     return None
 
 
+def scan_static_files(root: Path, skip_dirs: tuple = ()) -> dict:
+    """Map every file under root to its absolute path, keyed by URL-relative posix path"""
+    skipped = {root / name for name in skip_dirs}
+    files = {}
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if Path(entry.path) not in skipped:
+                        pending.append(Path(entry.path))
+                elif entry.is_file():
+                    path = Path(entry.path)
+                    files[path.relative_to(root).as_posix()] = path
+    return files
+
+
 # Try to find and serve static files (auto-detect, works regardless of NODE_ENV)
-static_path = get_static_path()
+# Resolved once at import; everything below reads STATIC_PATH
+STATIC_PATH = get_static_path()
 
-if static_path and static_path.exists():
-    print(f"[FastAPI] Serving frontend from: {static_path}")
+if STATIC_PATH is not None:
+    print(f"[FastAPI] Serving frontend from: {STATIC_PATH}")
+    
+    # Index the build output once so SPA routing needs no per-request stat() calls.
+    # assets/ is served by the StaticFiles mount, so it is left out.
+    STATIC_FILES = scan_static_files(STATIC_PATH, skip_dirs=("assets",))
+    INDEX_BYTES = (STATIC_PATH / "index.html").read_bytes()
+    INDEX_ETAG = weak_etag(INDEX_BYTES)
+    STATIC_ETAGS = {rel_path: weak_etag(path.read_bytes()) for rel_path, path in STATIC_FILES.items()}
+    print(f"[FastAPI] Indexed {len(STATIC_FILES)} static files")
+    
+    def index_response(request: Request) -> Response:
+        headers = {"ETag": INDEX_ETAG, "Cache-Control": "no-cache"}
+        if is_not_modified(request, INDEX_ETAG):
+            return Response(status_code=304, headers=headers)
+        return Response(INDEX_BYTES, media_type="text/html", headers=headers)
+    
+    def static_file_response(request: Request, rel_path: str, media_type: Optional[str] = None) -> Response:
+        file_path = STATIC_FILES.get(rel_path)
+        if file_path is None:
+            return ORJSONResponse(status_code=404, content={"error": "Not found"})
+        
+        etag = STATIC_ETAGS[rel_path]
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(str(file_path), media_type=media_type, headers=headers)
+    
+    # Tiny fixed assets are held in memory - no open()/stat() per request.
+    # Their URLs carry no content hash, so they revalidate by ETag like other static files.
+    CACHED_ASSETS = {
+        rel_path: STATIC_FILES[rel_path].read_bytes()
+        for rel_path in ("favicon.png", "opengraph.jpg")
+        if rel_path in STATIC_FILES
+    }
+    
+    def cached_asset_response(request: Request, rel_path: str, media_type: str) -> Response:
+        body = CACHED_ASSETS.get(rel_path)
+        if body is None:
+            return ORJSONResponse(status_code=404, content={"error": "Not found"})
+        
+        etag = STATIC_ETAGS[rel_path]
+        headers = {"ETag": etag, "Cache-Control": "public, max-age=3600"}
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
     
     # Mount assets directory
-    assets_path = static_path / "assets"
+    assets_path = STATIC_PATH / "assets"
     if assets_path.exists():
         app.mount("/assets", StaticFiles(directory=str(assets_path)), name="assets")
         print(f"[FastAPI] Mounted /assets from {assets_path}")
     
     # Root route - serve SPA
     @app.get("/")
-    async def serve_root():
+    async def serve_root(request: Request):
         """Serve SPA index.html at root"""
-        index_path = static_path / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path), media_type="text/html")
-        return JSONResponse(status_code=404, content={"error": "index.html not found"})
+        return index_response(request)
     
     # Serve static files (favicon, opengraph, etc.)
     @app.get("/favicon.png")
-    async def serve_favicon():
-        favicon_path = static_path / "favicon.png"
-        if favicon_path.exists():
-            return FileResponse(str(favicon_path))
-        return JSONResponse(status_code=404, content={"error": "Not found"})
+    async def serve_favicon(request: Request):
+        return cached_asset_response(request, "favicon.png", "image/png")
     
     @app.get("/opengraph.jpg")
-    async def serve_opengraph():
-        og_path = static_path / "opengraph.jpg"
-        if og_path.exists():
-            return FileResponse(str(og_path), media_type="image/jpeg")
-        return JSONResponse(status_code=404, content={"error": "Not found"})
+    async def serve_opengraph(request: Request):
+        return cached_asset_response(request, "opengraph.jpg", "image/jpeg")
     
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
+    async def serve_spa(full_path: str, request: Request):
         """Serve SPA for all non-API routes"""
-        # Skip API routes and object routes
-        if full_path.startswith("api/") or full_path.startswith("objects/") or full_path.startswith("public-objects/"):
-            return JSONResponse(status_code=404, content={"error": "Not found"})
+        # Skip API, object and asset routes
+        if full_path.startswith(SPA_RESERVED_PREFIXES):
+            return ORJSONResponse(status_code=404, content={"error": "Not found"})
         
         # Try to serve the exact file first
-        file_path = static_path / full_path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(str(file_path))
+        if full_path in STATIC_FILES:
+            return static_file_response(request, full_path)
         
         # Fallback to index.html for SPA routing
-        index_path = static_path / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path), media_type="text/html")
-        return JSONResponse(status_code=404, content={"error": "Not found"})
+        return index_response(request)
 else:
     print(f"[FastAPI] No static files found - API only mode")
     
@@ -272,15 +496,37 @@ else:
 def main():
     """Main entry point"""
     port = settings.port  # Use port from settings (default 5000)
+    workers = settings.workers
+    loop = "asyncio" if sys.platform == "win32" else "uvloop"  # uvloop has no Windows support
+    
+    print(f"[FastAPI] Starting server on port {port} with {workers} worker(s)")
     
-    print(f"[FastAPI] Starting server on port {port}")
+    if workers > 1:
+        # Spawned workers of this script would re-run it as __mp_main__ and then import
+        # main:app again, building everything twice. Hand off to the uvicorn CLI instead
+        # so each worker imports the app exactly once.
+        os.environ["WEB_CONCURRENCY"] = str(workers)  # workers size their DB pools from this
+        os.execv(sys.executable, [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--app-dir", str(Path(__file__).parent),
+            "--host", "0.0.0.0",
+            "--port", str(port),
+            "--workers", str(workers),
+            "--loop", loop,
+            "--http", "httptools",
+            "--log-level", "info",
+            "--no-access-log",  # AccessLogMiddleware already logs /api requests
+        ])
     
     uvicorn.run(
         app,  # Use the app object directly
         host="0.0.0.0",
         port=port,
+        loop=loop,
+        http="httptools",
         reload=False,  # Disable reload for stability
         log_level="info",
+        access_log=False,  # AccessLogMiddleware already logs /api requests
     )
 
 